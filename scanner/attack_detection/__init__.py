@@ -1,3 +1,3 @@
 """Gói con phụ trách phân tích dấu hiệu tấn công."""
 
-from .engine import analyze_attack_surface  # noqa: F401
+from .engine import analyze_attack_surface, analyze_attack_surface_path  # noqa: F401
@@ -2,11 +2,156 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import List, Optional
+import io
+import ipaddress
+import mmap
+import os
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, List, Optional
 
+try:
+    import ahocorasick  # type: ignore
+except ImportError:  # pyahocorasick là tùy chọn; fallback quét chuỗi thuần Python.
+    ahocorasick = None  # type: ignore
 
-@dataclass
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # numpy là tùy chọn; fallback lọc ngưỡng thuần Python.
+    np = None  # type: ignore
+
+try:
+    from numba import njit  # type: ignore
+except ImportError:  # numba là tùy chọn; log nhỏ không đáng chi phí JIT.
+    njit = None  # type: ignore
+
+try:
+    import radix  # type: ignore
+except ImportError:  # py-radix là tùy chọn; fallback so khớp bằng ipaddress.
+    radix = None  # type: ignore
+
+_PROBING_KEYWORDS = [
+    "wp-admin", "phpmyadmin", "config.php", "backup", "secret", "private",
+    "internal", "uploads", "files", "download",
+]
+_SQL_PATTERNS = ['union select', 'or 1=1', 'drop table', 'exec(', 'script>']
+
+# File từ ngưỡng này trở lên được ánh xạ bộ nhớ thay vì đọc hết vào RAM.
+_MMAP_THRESHOLD = 64 * 1024
+
+# Biên dịch sẵn toàn bộ mẫu ở cấp module: trả chi phí compile một lần
+# cho mỗi process thay vì mỗi lần gọi phân tích.
+_PROBE_RE = re.compile("|".join(map(re.escape, _PROBING_KEYWORDS)))
+_SQL_RE = re.compile("|".join(map(re.escape, _SQL_PATTERNS)))
+_PROBE_RE_BYTES = re.compile(b"|".join(re.escape(k.encode()) for k in _PROBING_KEYWORDS))
+_SQL_RE_BYTES = re.compile(b"|".join(re.escape(p.encode()) for p in _SQL_PATTERNS))
+
+# Log vượt ngưỡng này mới đi qua kernel numba, tránh trả phí warm-up JIT
+# cho những file nhỏ.
+_NUMBA_THRESHOLD = 1 << 20
+
+if njit is not None and np is not None:
+
+    @njit(cache=True)
+    def _scan_counts_nb(buf):  # pragma: no cover - thân hàm do numba biên dịch
+        """Đếm 404/500 và số dòng có nội dung trong một lượt trên bytes."""
+        not_found = 0
+        errors = 0
+        total = 0
+        line_has_content = False
+        n = buf.shape[0]
+        i = 0
+        while i < n:
+            c = buf[i]
+            if c == 10:  # '\n'
+                if line_has_content:
+                    total += 1
+                line_has_content = False
+                i += 1
+                continue
+            if c != 32 and c != 9 and c != 13:  # ' ', '\t', '\r'
+                line_has_content = True
+            if c == 52 and i + 2 < n and buf[i + 1] == 48 and buf[i + 2] == 52:  # '404'
+                not_found += 1
+                i += 3
+                continue
+            if c == 53 and i + 2 < n and buf[i + 1] == 48 and buf[i + 2] == 48:  # '500'
+                errors += 1
+                i += 3
+                continue
+            i += 1
+        if line_has_content:
+            total += 1
+        return not_found, errors, total
+
+else:
+    _scan_counts_nb = None
+
+
+def _build_automaton():
+    """Biên dịch automaton Aho-Corasick cho toàn bộ mẫu nhận diện.
+
+    Gộp từ khóa dò quét và mẫu SQL injection vào một DFA duy nhất để mỗi
+    dòng log chỉ cần quét một lần thay vì thử từng mẫu con.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for keyword in _PROBING_KEYWORDS:
+        automaton.add_word(keyword, ("probe", keyword))
+    for pattern in _SQL_PATTERNS:
+        automaton.add_word(pattern, ("sql", pattern))
+    automaton.make_automaton()
+    return automaton
+
+
+_AUTOMATON = _build_automaton()
+
+
+# Danh sách CIDR đen (mặc định rỗng). Khi có py-radix, tra cứu là O(32)
+# phép bit trên cây radix; fallback duyệt tuần tự các network ipaddress.
+_blocklist_tree = None
+_blocklist_networks: List[ipaddress._BaseNetwork] = []
+
+
+def load_blocklist(cidrs: Iterable[str]) -> int:
+    """Nạp danh sách CIDR/IP đen dùng khi phân tích log; trả về số mục hợp lệ."""
+    global _blocklist_tree, _blocklist_networks
+    networks = []
+    for cidr in cidrs:
+        try:
+            networks.append(ipaddress.ip_network(cidr.strip(), strict=False))
+        except ValueError:
+            continue
+    _blocklist_networks = networks
+    if radix is not None:
+        tree = radix.Radix()
+        for network in networks:
+            tree.add(str(network))
+        _blocklist_tree = tree
+    else:
+        _blocklist_tree = None
+    return len(networks)
+
+
+def _in_blocklist(ip: str) -> bool:
+    """Kiểm tra một IP quan sát được có khớp danh sách đen hay không."""
+    if not _blocklist_networks:
+        return False
+    if _blocklist_tree is not None:
+        try:
+            return _blocklist_tree.search_best(ip) is not None
+        except ValueError:
+            return False
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in _blocklist_networks)
+
+
+@dataclass(slots=True)
 class AttackFinding:
     """Đại diện một phát hiện liên quan tới tấn công."""
 
@@ -16,7 +161,7 @@ class AttackFinding:
     indicators: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class AttackSummary:
     """Thông tin tổng hợp sau khi phân tích."""
 
@@ -24,6 +169,105 @@ class AttackSummary:
     findings: List[AttackFinding] = field(default_factory=list)
     notes: List[str] = field(default_factory=list)
 
+    def to_dict(self) -> dict:
+        """Dạng dict sẵn sàng cho JSON/template, gồm cả findings lồng bên trong."""
+        return asdict(self)
+
+
+def _summarize_counters(
+    not_found_count: int,
+    error_count: int,
+    probe_hits: int,
+    sql_count: int,
+    total_requests: int,
+    ip_count: Counter,
+    analyzed_note: str,
+) -> AttackSummary:
+    """Dựng AttackSummary từ bộ đếm đã gom trong một lượt quét log."""
+    findings = []
+
+    # Kiểm tra một số dấu hiệu cơ bản
+    if not_found_count > 30:
+        findings.append(AttackFinding(
+            category="Path Scanning",
+            severity="MEDIUM",
+            summary=f"Phát hiện {not_found_count} lỗi 404 - có thể là quét thư mục",
+            indicators=["HTTP 404", "Directory scanning"]
+        ))
+    elif not_found_count >= 5:
+        findings.append(AttackFinding(
+            category="Path Scanning",
+            severity="LOW",
+            summary=f"Phát hiện {not_found_count} lỗi 404 bất thường - cần theo dõi thêm",
+            indicators=["HTTP 404"]
+        ))
+
+    if probe_hits and probe_hits < 20:
+        findings.append(AttackFinding(
+            category="Reconnaissance",
+            severity="LOW",
+            summary=f"Ghi nhận {probe_hits} truy vấn tới tài nguyên nhạy cảm.",
+            indicators=list(_PROBING_KEYWORDS),
+        ))
+
+    if error_count > 5:
+        findings.append(AttackFinding(
+            category="Application Error",
+            severity="HIGH",
+            summary=f"Nhiều lỗi 500 ({error_count} lần) - có thể bị khai thác",
+            indicators=["HTTP 500", "Server errors"]
+        ))
+
+    # Kiểm tra SQL injection patterns
+    if sql_count > 0:
+        findings.append(AttackFinding(
+            category="SQL Injection",
+            severity="HIGH",
+            summary=f"Phát hiện {sql_count} mẫu SQL injection trong log",
+            indicators=list(_SQL_PATTERNS)
+        ))
+
+    # Phát hiện DDoS - kiểm tra ngưỡng tổng request
+    if total_requests > 1000:
+        findings.append(AttackFinding(
+            category="DDoS Suspicion",
+            severity="HIGH",
+            summary=f"Tổng {total_requests} request - vượt ngưỡng bình thường",
+            indicators=[f"Total requests: {total_requests}"]
+        ))
+
+    # Kiểm tra IP có lưu lượng bất thường. Với histogram lớn, lọc ngưỡng
+    # bằng numpy để tránh duyệt từng cặp (ip, count) trong interpreter.
+    if np is not None and len(ip_count) > 1024:
+        ips = list(ip_count.keys())
+        values = np.fromiter(ip_count.values(), dtype=np.int64, count=len(ip_count))
+        offenders = ((ips[i], int(values[i])) for i in np.flatnonzero(values > 100))
+    else:
+        offenders = ((ip, count) for ip, count in ip_count.items() if count > 100)
+
+    for ip, count in offenders:  # Ngưỡng request/IP: 100
+        findings.append(AttackFinding(
+            category="Rate Limiting",
+            severity="MEDIUM" if count < 500 else "HIGH",
+            summary=f"IP {ip} gửi {count} request - có thể tấn công flood",
+            indicators=[f"IP: {ip}", f"Requests: {count}"]
+        ))
+
+    # Đối chiếu mọi IP quan sát được với danh sách đen (nếu đã nạp).
+    if _blocklist_networks:
+        for ip, count in ip_count.items():
+            if _in_blocklist(ip):
+                findings.append(AttackFinding(
+                    category="Known Bad IP",
+                    severity="HIGH",
+                    summary=f"IP {ip} nằm trong danh sách đen ({count} request)",
+                    indicators=[f"IP: {ip}", "Blocklist match"]
+                ))
+
+    if findings:
+        return AttackSummary(status="THREATS_DETECTED", findings=findings)
+    return AttackSummary(status="ANALYZED", findings=[], notes=[analyzed_note])
+
 
 def analyze_attack_surface(target: str, log_content: Optional[bytes] = None) -> AttackSummary:
     """Placeholder phân tích tấn công cho từng mục tiêu.
@@ -35,98 +279,113 @@ def analyze_attack_surface(target: str, log_content: Optional[bytes] = None) ->
     if log_content:
         # Giả lập phân tích log đơn giản
         log_text = log_content.decode('utf-8', errors='ignore')
-        log_lines = [line for line in log_text.split('\n') if line.strip()]
-        findings = []
-        
-        # Kiểm tra một số dấu hiệu cơ bản
-        not_found_count = log_text.count('404') if '404' in log_text else 0
-        if not_found_count > 30:
-            findings.append(AttackFinding(
-                category="Path Scanning",
-                severity="MEDIUM", 
-                summary=f"Phát hiện {not_found_count} lỗi 404 - có thể là quét thư mục",
-                indicators=["HTTP 404", "Directory scanning"]
-            ))
-        elif not_found_count >= 5:
-            findings.append(AttackFinding(
-                category="Path Scanning",
-                severity="LOW",
-                summary=f"Phát hiện {not_found_count} lỗi 404 bất thường - cần theo dõi thêm",
-                indicators=["HTTP 404"]
-            ))
-
-        probing_keywords = [
-            "wp-admin", "phpmyadmin", "config.php", "backup", "secret", "private",
-            "internal", "uploads", "files", "download",
-        ]
-        probe_hits = sum(1 for line in log_lines if any(keyword in line for keyword in probing_keywords))
-        if probe_hits and probe_hits < 20:
-            findings.append(AttackFinding(
-                category="Reconnaissance",
-                severity="LOW",
-                summary=f"Ghi nhận {probe_hits} truy vấn tới tài nguyên nhạy cảm.",
-                indicators=probing_keywords,
-            ))
-        
-        if '500' in log_text and log_text.count('500') > 5:
-            findings.append(AttackFinding(
-                category="Application Error",
-                severity="HIGH",
-                summary=f"Nhiều lỗi 500 ({log_text.count('500')} lần) - có thể bị khai thác",
-                indicators=["HTTP 500", "Server errors"]
-            ))
-            
-        # Kiểm tra SQL injection patterns
-        sql_patterns = ['union select', 'or 1=1', 'drop table', 'exec(', 'script>']
-        sql_count = sum(log_text.lower().count(pattern) for pattern in sql_patterns)
-        if sql_count > 0:
-            findings.append(AttackFinding(
-                category="SQL Injection",
-                severity="HIGH",
-                summary=f"Phát hiện {sql_count} mẫu SQL injection trong log",
-                indicators=sql_patterns
-            ))
-        
-        # Phát hiện DDoS - đếm số request và IP
-        ip_count = {}
-        total_requests = len(log_lines)
-
-        for line in log_lines:
-            parts = line.split()
+
+        # Quét một lượt duy nhất: hạ chữ thường một lần rồi gom toàn bộ
+        # bộ đếm (404/500, dò quét, SQL injection, histogram IP) trong
+        # cùng một vòng lặp thay vì duyệt lại log nhiều lần.
+        log_lower = log_text.lower()
+        not_found_count = 0
+        error_count = 0
+        probe_hits = 0
+        sql_count = 0
+        total_requests = 0
+        ip_count: Counter = Counter()
+
+        # Với log rất lớn, đẩy phần đếm số học (404/500/tổng dòng) xuống
+        # kernel numba chạy trên buffer bytes; vòng lặp Python bên dưới
+        # chỉ còn lo phần mẫu chuỗi và histogram IP.
+        precounted = False
+        if _scan_counts_nb is not None and len(log_content) > _NUMBA_THRESHOLD:
+            buf = np.frombuffer(log_content, dtype=np.uint8)
+            not_found_count, error_count, total_requests = _scan_counts_nb(buf)
+            precounted = True
+
+        # Duyệt dòng qua StringIO thay vì split('\n'): không vật chất hóa
+        # toàn bộ log thành danh sách chuỗi, mỗi thời điểm chỉ một dòng sống.
+        for line in io.StringIO(log_lower):
+            if not line.strip():
+                continue
+            if not precounted:
+                total_requests += 1
+                not_found_count += line.count('404')
+                error_count += line.count('500')
+            if _AUTOMATON is not None:
+                probe_seen = False
+                for _, (category, _pattern) in _AUTOMATON.iter(line):
+                    if category == "sql":
+                        sql_count += 1
+                    else:
+                        probe_seen = True
+                if probe_seen:
+                    probe_hits += 1
+            else:
+                if _PROBE_RE.search(line):
+                    probe_hits += 1
+                sql_count += len(_SQL_RE.findall(line))
+            parts = line.split(None, 1)
             if parts:
-                ip = parts[0]
-                ip_count[ip] = ip_count.get(ip, 0) + 1
-        
-        # Kiểm tra ngưỡng DDoS
-        if total_requests > 1000:
-            findings.append(AttackFinding(
-                category="DDoS Suspicion",
-                severity="HIGH",
-                summary=f"Tổng {total_requests} request - vượt ngưỡng bình thường",
-                indicators=[f"Total requests: {total_requests}"]
-            ))
-        
-        # Kiểm tra IP có lưu lượng bất thường
-        for ip, count in ip_count.items():
-            if count > 100:  # Ngưỡng request/IP
-                findings.append(AttackFinding(
-                    category="Rate Limiting",
-                    severity="MEDIUM" if count < 500 else "HIGH",
-                    summary=f"IP {ip} gửi {count} request - có thể tấn công flood",
-                    indicators=[f"IP: {ip}", f"Requests: {count}"]
-                ))
-        
-        if findings:
-            return AttackSummary(status="THREATS_DETECTED", findings=findings)
-        else:
-            return AttackSummary(
-                status="ANALYZED", 
-                findings=[], 
-                notes=[f"Đã phân tích {len(log_text)} ký tự log, không phát hiện dấu hiệu đáng ngờ."]
-            )
+                ip_count[parts[0]] += 1
+
+        return _summarize_counters(
+            not_found_count,
+            error_count,
+            probe_hits,
+            sql_count,
+            total_requests,
+            ip_count,
+            f"Đã phân tích {len(log_text)} ký tự log, không phát hiện dấu hiệu đáng ngờ.",
+        )
 
     notes = [
         "Chưa nhận được log lưu lượng hay cảnh báo IDS cho mục tiêu này.",
         "Tích hợp log truy cập, WAF/IDS hoặc nguồn NetFlow để kích hoạt phân tích tự động.",
     ]
     return AttackSummary(status="NO_DATA", findings=[], notes=notes)
+
+
+def analyze_attack_surface_path(target: str, log_path: str) -> AttackSummary:
+    """Phân tích file log trực tiếp từ đĩa qua mmap.
+
+    File lớn được ánh xạ bộ nhớ và quét ngay trên buffer bytes, tránh
+    nhân đôi RSS (bytes thô + chuỗi đã decode + danh sách dòng). File
+    nhỏ hơn ngưỡng đi theo đường in-memory sẵn có.
+    """
+    size = os.path.getsize(log_path)
+    with open(log_path, "rb") as handle:
+        if size < _MMAP_THRESHOLD:
+            return analyze_attack_surface(target, handle.read())
+
+        mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            not_found_count = 0
+            error_count = 0
+            probe_hits = 0
+            sql_count = 0
+            total_requests = 0
+            ip_count: Counter = Counter()
+
+            for raw_line in iter(mm.readline, b""):
+                line = raw_line.lower()
+                if not line.strip():
+                    continue
+                total_requests += 1
+                not_found_count += line.count(b"404")
+                error_count += line.count(b"500")
+                if _PROBE_RE_BYTES.search(line):
+                    probe_hits += 1
+                sql_count += len(_SQL_RE_BYTES.findall(line))
+                parts = line.split(None, 1)
+                if parts:
+                    ip_count[parts[0].decode("ascii", "ignore")] += 1
+
+            return _summarize_counters(
+                not_found_count,
+                error_count,
+                probe_hits,
+                sql_count,
+                total_requests,
+                ip_count,
+                f"Đã phân tích {size} byte log, không phát hiện dấu hiệu đáng ngờ.",
+            )
+        finally:
+            mm.close()
@@ -4,19 +4,48 @@ from __future__ import annotations
 
 import asyncio
 import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from urllib.parse import urlparse
 
 import aiohttp
 
+try:
+    from sslyze import (  # type: ignore
+        Scanner,
+        ServerNetworkLocation,
+        ServerScanRequest,
+        ServerScanResultAsJson,
+    )
+except ImportError:  # sslyze dạng thư viện là tùy chọn; fallback gọi subprocess.
+    Scanner = None  # type: ignore
+
 from modules.rule_engine import classify_risk, score_findings, suggestions_from_findings
-from modules.tls_engine import fetch_tls_details
+from modules.tls_engine import details_from_ssl_object, fetch_tls_details_parsed
 from modules.web_crawler import crawl_site
 from attack_detection import analyze_attack_surface
 
 
-def extract_hostport(url: str) -> str:
-    """Rút trích host:port để chạy công cụ bên ngoài như SSLyze."""
+# Pool luồng dùng chung cho các tác vụ blocking (TLS, sslyze, phân tích log).
+# Executor mặc định của asyncio khá hẹp nên fan-out lớn sẽ bị xếp hàng;
+# pool riêng với độ rộng cố định cho phép quét song song gần tuyến tính.
+_SCAN_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="scan")
+
+
+async def _run_blocking(func, *args) -> object:
+    """Chạy hàm blocking trên pool luồng dùng chung của module."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_SCAN_EXECUTOR, func, *args)
+
+
+# Kết quả parse một lần cho mỗi URL; các bước TLS/sslyze dùng lại thay vì
+# mỗi bước tự gọi urlparse.
+ParsedTarget = namedtuple("ParsedTarget", "scheme host port hostport")
+
+
+def parse_target(url: str) -> ParsedTarget:
+    """Parse URL mục tiêu một lần thành (scheme, host, port, host:port)."""
     parsed = urlparse(url)
     host = parsed.hostname or url
     if parsed.port:
@@ -25,7 +54,12 @@ def extract_hostport(url: str) -> str:
         port = 80
     else:
         port = 443
-    return f"{host}:{port}"
+    return ParsedTarget(parsed.scheme, host, port, f"{host}:{port}")
+
+
+def extract_hostport(url: str) -> str:
+    """Rút trích host:port để chạy công cụ bên ngoài như SSLyze."""
+    return parse_target(url).hostport
 
 
 def run_sslyze(target: str) -> Dict[str, str]:
@@ -51,17 +85,85 @@ def run_sslyze(target: str) -> Dict[str, str]:
         return {"error": str(exc)}
 
 
-async def fetch_target(session: aiohttp.ClientSession, url: str) -> Dict[str, object]:
-    """Gửi HTTP GET để lấy status, header và một phần nội dung."""
+def run_sslyze_batch(hostports: List[str]) -> Dict[str, Dict[str, str]]:
+    """Quét sslyze trong process cho cả mẻ host:port bằng một Scanner chung.
+
+    Tránh chi phí fork/exec và khởi động interpreter cho từng mục tiêu;
+    toàn bộ yêu cầu được xếp hàng một lần rồi thu kết quả tuần tự.
+    """
+    results: Dict[str, Dict[str, str]] = {}
+    requests = []
+    for hostport in hostports:
+        host, _, port = hostport.rpartition(":")
+        try:
+            requests.append(
+                ServerScanRequest(
+                    server_location=ServerNetworkLocation(hostname=host, port=int(port))
+                )
+            )
+        except Exception as exc:  # noqa: BLE001 - ví dụ hostname không phân giải được
+            results[hostport] = {"error": str(exc)}
+
+    if requests:
+        try:
+            scanner = Scanner()
+            scanner.queue_scans(requests)
+            for result in scanner.get_results():
+                hostport = f"{result.server_location.hostname}:{result.server_location.port}"
+                entry: Dict[str, str] = {"status": result.scan_status.name}
+                try:
+                    entry["output"] = ServerScanResultAsJson.from_orm(result).json()
+                except Exception as exc:  # noqa: BLE001
+                    entry["error"] = str(exc)
+                results[hostport] = entry
+        except Exception as exc:  # noqa: BLE001
+            for hostport in hostports:
+                results.setdefault(hostport, {"error": str(exc)})
+    return results
+
+
+async def fetch_target(
+    session: aiohttp.ClientSession,
+    url: str,
+    full_body: bool = False,
+) -> Dict[str, object]:
+    """Gửi HTTP GET để lấy status, header và một phần nội dung.
+
+    Mặc định chỉ đọc 512 byte đầu cho snippet rồi trả kết nối về pool,
+    thay vì tải và decode toàn bộ body chỉ để cắt 500 ký tự. Đặt
+    ``full_body=True`` khi thật sự cần đọc trọn phản hồi.
+
+    Timeout và chính sách TLS lấy từ cấu hình chung của session nên
+    không dựng lại các đối tượng đó cho từng request.
+    """
     try:
-        async with session.get(url, timeout=10, ssl=False) as response:
-            body = await response.text()
-            return {
+        async with session.get(url) as response:
+            # Tận dụng socket TLS mà aiohttp vừa bắt tay: nếu còn giữ được
+            # kết nối (body lớn chưa đọc hết) thì khỏi phải bắt tay lần hai.
+            # Với phản hồi nhỏ aiohttp có thể đã trả kết nối về pool trước
+            # khi tới đây (connection là None) — khi đó fallback bắt tay
+            # riêng vẫn chạy như cũ.
+            tls_captured: Optional[Dict[str, object]] = None
+            connection = response.connection
+            if connection is not None and connection.transport is not None:
+                ssl_object = connection.transport.get_extra_info("ssl_object")
+                if ssl_object is not None:
+                    tls_captured = details_from_ssl_object(ssl_object)
+            if full_body:
+                body_snippet = (await response.text())[:500]
+            else:
+                raw = await response.content.read(512)
+                body_snippet = raw.decode(response.charset or "utf-8", "ignore")[:500]
+                response.release()
+            result: Dict[str, object] = {
                 "url": url,
                 "status": response.status,
                 "headers": dict(response.headers),
-                "body_snippet": body[:500],
+                "body_snippet": body_snippet,
             }
+            if tls_captured is not None:
+                result["tls_captured"] = tls_captured
+            return result
     except Exception as exc:  # noqa: BLE001
         return {"url": url, "error": str(exc)}
 
@@ -121,13 +223,13 @@ async def scan_targets(urls: List[str], log_content: Optional[bytes] = None) ->
         *args,
     ) -> object:
         async with semaphore:
-            return await asyncio.to_thread(func, *args)
+            return await _run_blocking(func, *args)
 
     async def _process_target(
         session: aiohttp.ClientSession,
         result: Dict[str, object],
-        tls_sem: asyncio.Semaphore,
         sslyze_sem: asyncio.Semaphore,
+        sslyze_batch_task: Optional["asyncio.Task"],
         crawl_sem: asyncio.Semaphore,
     ) -> Dict[str, object]:
         entry: Dict[str, object] = {"url": result.get("url")}
@@ -145,10 +247,21 @@ async def scan_targets(urls: List[str], log_content: Optional[bytes] = None) ->
         entry["suggestions"] = suggestions_from_findings(entry["findings"])
 
         url = entry["url"] or ""
-        hostport = extract_hostport(url)
+        target = parse_target(url)
+        hostport = target.hostport
 
-        tls_task = asyncio.create_task(_run_in_thread(tls_sem, fetch_tls_details, url))
-        sslyze_task = asyncio.create_task(_run_in_thread(sslyze_sem, run_sslyze, hostport))
+        # Chỉ bắt tay TLS riêng khi lượt GET không thu được metadata TLS.
+        # Session quét dùng ssl=False (CERT_NONE) nên getpeercert luôn rỗng
+        # — cả ở đây lẫn trong _handshake fallback — vì vậy gate theo
+        # cipher/protocol: đó là toàn bộ thông tin mà lượt bắt tay riêng
+        # có thể bổ sung.
+        captured_tls = result.get("tls_captured")
+        tls_task = None
+        if not (isinstance(captured_tls, dict) and captured_tls.get("cipher")):
+            tls_task = asyncio.create_task(_run_blocking(fetch_tls_details_parsed, target))
+        sslyze_task = None
+        if sslyze_batch_task is None:
+            sslyze_task = asyncio.create_task(_run_in_thread(sslyze_sem, run_sslyze, hostport))
 
         async def _crawl() -> Dict[str, object]:
             async with crawl_sem:
@@ -159,38 +272,50 @@ async def scan_targets(urls: List[str], log_content: Optional[bytes] = None) ->
 
         crawl_task = asyncio.create_task(_crawl())
 
-        attack_task = asyncio.create_task(asyncio.to_thread(analyze_attack_surface, url, log_content))
+        attack_task = asyncio.create_task(_run_blocking(analyze_attack_surface, url, log_content))
 
-        entry["tls"] = await tls_task
-        entry["sslyze"] = await sslyze_task
+        entry["tls"] = captured_tls if tls_task is None else await tls_task
+        if sslyze_batch_task is not None:
+            batch_results = await sslyze_batch_task
+            entry["sslyze"] = batch_results.get(hostport, {"error": "Không có kết quả sslyze."})
+        else:
+            entry["sslyze"] = await sslyze_task
         entry["crawl"] = await crawl_task
 
         attack_summary = await attack_task
-        entry["attack_detection"] = {
-            "status": attack_summary.status,
-            "findings": [
-                {
-                    "category": finding.category,
-                    "severity": finding.severity,
-                    "summary": finding.summary,
-                    "indicators": finding.indicators,
-                }
-                for finding in attack_summary.findings
-            ],
-            "notes": attack_summary.notes,
-        }
+        entry["attack_detection"] = attack_summary.to_dict()
         return entry
 
-    async with aiohttp.ClientSession() as session:
+    # Connector chia sẻ với giới hạn rõ ràng: giữ keepalive, cache DNS và
+    # chặn việc mở quá nhiều kết nối tới cùng một host.
+    connector = aiohttp.TCPConnector(
+        limit=100,
+        limit_per_host=10,
+        ttl_dns_cache=300,
+        ssl=False,
+        enable_cleanup_closed=True,
+    )
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
         fetch_tasks = [fetch_target(session, url) for url in urls]
         raw_results = await asyncio.gather(*fetch_tasks)
 
-        tls_sem = asyncio.Semaphore(8)
         sslyze_sem = asyncio.Semaphore(3)
         crawl_sem = asyncio.Semaphore(4)
 
+        # Khi có thư viện sslyze, gom mọi host:port vào một mẻ quét chung
+        # thay vì chạy subprocess cho từng mục tiêu.
+        sslyze_batch_task: Optional[asyncio.Task] = None
+        if Scanner is not None:
+            hostports = sorted({
+                extract_hostport(str(result.get("url") or ""))
+                for result in raw_results
+                if "error" not in result
+            })
+            sslyze_batch_task = asyncio.create_task(_run_blocking(run_sslyze_batch, hostports))
+
         process_tasks = [
-            _process_target(session, result, tls_sem, sslyze_sem, crawl_sem)
+            _process_target(session, result, sslyze_sem, sslyze_batch_task, crawl_sem)
             for result in raw_results
         ]
         aggregated = await asyncio.gather(*process_tasks)
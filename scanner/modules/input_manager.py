@@ -1,26 +1,55 @@
-"""Xử lý và chuẩn hóa danh sách mục tiêu nhập vào."""
-
-from typing import Iterable, List, Optional
-
-
-def normalize_target(raw: str) -> Optional[str]:
-    """Chuẩn hóa chuỗi nhập thành URL hợp lệ."""
-    candidate = raw.strip()
-    if not candidate:
-        return None
-    if "://" not in candidate:
-        candidate = f"https://{candidate}"
-    return candidate
-
-
-def prepare_targets(entries: Iterable[str]) -> List[str]:
-    """Loại bỏ bản ghi trống/trùng và trả về danh sách mục tiêu hợp lệ."""
-    seen: set[str] = set()
-    prepared: List[str] = []
-    for entry in entries:
-        normalized = normalize_target(entry)
-        if not normalized or normalized in seen:
-            continue
-        seen.add(normalized)
-        prepared.append(normalized)
-    return prepared
+"""Xử lý và chuẩn hóa danh sách mục tiêu nhập vào."""
+
+import sys
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+
+def normalize_target(raw: str) -> Optional[str]:
+    """Chuẩn hóa chuỗi nhập thành URL hợp lệ."""
+    candidate = raw.strip()
+    if not candidate:
+        return None
+    if "://" not in candidate:
+        candidate = f"https://{candidate}"
+    return candidate
+
+
+def _canonical_key(normalized: str) -> Tuple:
+    """Khóa khử trùng lặp theo scheme/host/port đã chuẩn hóa.
+
+    Cùng một mục tiêu viết khác hoa thường hoặc kèm port mặc định
+    (https://Ex.Com với https://ex.com:443) chỉ được giữ một bản ghi.
+    Đầu vào dị dạng (port không phải số, netloc hỏng...) không parse
+    được thì dùng chính chuỗi đã chuẩn hóa làm khóa; bước fetch sau sẽ
+    báo lỗi cho từng mục tiêu như trước.
+    """
+    try:
+        parsed = urlparse(normalized)
+        default_port = 80 if parsed.scheme == "http" else 443
+        return (
+            parsed.scheme,
+            parsed.hostname,
+            parsed.port or default_port,
+            parsed.path or "/",
+            parsed.query,
+        )
+    except ValueError:
+        return (normalized,)
+
+
+def prepare_targets(entries: Iterable[str]) -> List[str]:
+    """Loại bỏ bản ghi trống/trùng và trả về danh sách mục tiêu hợp lệ."""
+    seen: set[Tuple] = set()
+    prepared: List[str] = []
+    for entry in entries:
+        normalized = normalize_target(entry)
+        if not normalized:
+            continue
+        key = _canonical_key(normalized)
+        if key in seen:
+            continue
+        seen.add(key)
+        # intern để các URL lặp lại trong file đầu vào lớn chia sẻ bộ nhớ.
+        prepared.append(sys.intern(normalized))
+    return prepared
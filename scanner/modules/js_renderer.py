@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import asyncio
+import atexit
 from dataclasses import dataclass
 from typing import List, Optional
 
@@ -105,9 +107,46 @@ class JSRenderer:
         if not html:
             return None
 
-        unique_urls = []
-        for nav_url in navigated:
-            if nav_url not in unique_urls:
-                unique_urls.append(nav_url)
+        # dict.fromkeys giữ thứ tự và khử trùng lặp trong O(n).
+        unique_urls = list(dict.fromkeys(navigated))
 
         return RenderResult(html=html, navigated_urls=unique_urls)
+
+
+# Renderer dùng chung cho cả process: Chromium chỉ khởi động một lần và
+# được tái sử dụng qua nhiều lượt quét thay vì launch lại mỗi batch.
+_instance: Optional[JSRenderer] = None
+_instance_lock = asyncio.Lock()
+
+
+async def get_renderer() -> JSRenderer:
+    """Trả về renderer dùng chung, khởi động lười ở lần gọi đầu tiên.
+
+    Khóa để nhiều coroutine cùng kích hoạt lần đầu không launch Chromium
+    trùng lặp.
+    """
+    global _instance
+    async with _instance_lock:
+        if _instance is None:
+            _instance = await JSRenderer().__aenter__()
+    return _instance
+
+
+async def shutdown_renderer() -> None:
+    """Đóng renderer dùng chung (nếu có) và giải phóng Chromium."""
+    global _instance
+    if _instance is not None:
+        await _instance.__aexit__(None, None, None)
+        _instance = None
+
+
+def _shutdown_at_exit() -> None:
+    if _instance is None:
+        return
+    try:
+        asyncio.run(shutdown_renderer())
+    except Exception:  # noqa: BLE001 - best effort khi interpreter thoát
+        pass
+
+
+atexit.register(_shutdown_at_exit)
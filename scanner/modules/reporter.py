@@ -1,43 +1,71 @@
-"""Định dạng kết quả quét cho giao diện dòng lệnh."""
-
-from typing import Dict, List
-
-import typer
-
-
-def print_summary(results: List[Dict[str, object]]) -> None:
-    """In kết quả bằng tiếng Việt, nhấn mạnh rủi ro và gợi ý."""
-    for item in results:
-        typer.echo()
-        typer.echo(f"Mục tiêu: {item.get('url')}")
-        if item.get("error"):
-            typer.echo(f"  Lỗi: {item['error']}")
-            continue
-        typer.echo(f"  Trạng thái HTTP: {item.get('status')}")
-        typer.echo(
-            f"  Điểm đánh giá: {item.get('score')} (Mức rủi ro: {item.get('risk')})"
-        )
-        for finding in item.get("findings", []):
-            typer.echo(
-                f"    - {finding['severity']}: {finding['rule']} ({finding['detail']})"
-            )
-        suggestions = item.get("suggestions", [])
-        if suggestions:
-            typer.echo("  Gợi ý cải thiện:")
-            for suggestion in suggestions:
-                typer.echo(f"    • {suggestion}")
-        tls_details = item.get("tls") or {}
-        if tls_details.get("error"):
-            typer.echo(f"  Lỗi TLS: {tls_details['error']}")
-        else:
-            cipher = tls_details.get("cipher", {})
-            typer.echo(
-                "  TLS: protocol={} cipher={}".format(
-                    tls_details.get("protocol"), cipher.get("name")
-                )
-            )
-        sslyze = item.get("sslyze") or {}
-        if sslyze.get("error"):
-            typer.echo(f"  Lỗi sslyze: {sslyze['error']}")
-        elif sslyze:
-            typer.echo(f"  Mã trả về sslyze: {sslyze.get('return_code')}")
+"""Định dạng kết quả quét cho giao diện dòng lệnh."""
+
+import json
+from typing import Dict, List
+
+import typer
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # orjson là tùy chọn; fallback dùng json chuẩn.
+    orjson = None  # type: ignore
+
+
+def render_summary(results: List[Dict[str, object]]) -> str:
+    """Dựng toàn bộ báo cáo thành một chuỗi duy nhất.
+
+    Gom từng dòng vào buffer rồi join một lần để tránh hàng chục lần
+    ghi stdout riêng lẻ cho mỗi mục tiêu.
+    """
+    lines: List[str] = []
+    for item in results:
+        lines.append("")
+        lines.append(f"Mục tiêu: {item.get('url')}")
+        if item.get("error"):
+            lines.append(f"  Lỗi: {item['error']}")
+            continue
+        lines.append(f"  Trạng thái HTTP: {item.get('status')}")
+        lines.append(
+            f"  Điểm đánh giá: {item.get('score')} (Mức rủi ro: {item.get('risk')})"
+        )
+        for finding in item.get("findings", []):
+            lines.append(
+                f"    - {finding['severity']}: {finding['rule']} ({finding['detail']})"
+            )
+        suggestions = item.get("suggestions", [])
+        if suggestions:
+            lines.append("  Gợi ý cải thiện:")
+            for suggestion in suggestions:
+                lines.append(f"    • {suggestion}")
+        tls_details = item.get("tls") or {}
+        if tls_details.get("error"):
+            lines.append(f"  Lỗi TLS: {tls_details['error']}")
+        else:
+            cipher = tls_details.get("cipher", {})
+            lines.append(
+                "  TLS: protocol={} cipher={}".format(
+                    tls_details.get("protocol"), cipher.get("name")
+                )
+            )
+        sslyze = item.get("sslyze") or {}
+        if sslyze.get("error"):
+            lines.append(f"  Lỗi sslyze: {sslyze['error']}")
+        elif sslyze:
+            lines.append(f"  Mã trả về sslyze: {sslyze.get('return_code')}")
+    return "\n".join(lines)
+
+
+def render_json(results: List[Dict[str, object]]) -> str:
+    """Serialize kết quả quét thành JSON, ưu tiên orjson khi có."""
+    if orjson is not None:
+        # OPT_NON_STR_KEYS: header từ fetch_target là multidict istr
+        # (subclass của str) mà orjson mặc định từ chối làm khóa.
+        return orjson.dumps(
+            results, default=str, option=orjson.OPT_NON_STR_KEYS
+        ).decode()
+    return json.dumps(results, default=str, ensure_ascii=False)
+
+
+def print_summary(results: List[Dict[str, object]]) -> None:
+    """In kết quả bằng tiếng Việt, nhấn mạnh rủi ro và gợi ý."""
+    typer.echo(render_summary(results))
@@ -1,16 +1,19 @@
 """Đánh giá mức rủi ro và đề xuất cải thiện cấu hình."""
 
+from collections import Counter
 from typing import Dict, List
 
+WEIGHTS = {"HIGH": 10, "MEDIUM": 5, "LOW": 1, "INFO": 0}
+
 
 def score_findings(findings: List[Dict[str, str]]) -> int:
-    """Cộng điểm dựa trên mức độ nghiêm trọng của từng phát hiện."""
-    score = 0
-    weights = {"HIGH": 10, "MEDIUM": 5, "LOW": 1, "INFO": 0}
-    for finding in findings:
-        severity = finding.get("severity", "INFO")
-        score += weights.get(severity, 0)
-    return score
+    """Cộng điểm dựa trên mức độ nghiêm trọng của từng phát hiện.
+
+    Gom số lượng theo mức độ bằng Counter (hiện thực bằng C) rồi nhân
+    với bảng trọng số, thay vì cộng dồn từng phát hiện trong Python.
+    """
+    severity_counts = Counter(finding.get("severity", "INFO") for finding in findings)
+    return sum(WEIGHTS.get(severity, 0) * count for severity, count in severity_counts.items())
 
 
 def classify_risk(score: int) -> str:
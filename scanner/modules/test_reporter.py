@@ -0,0 +1,47 @@
+"""Tests cho reporter, tập trung vào serialize JSON kết quả quét."""
+
+import json
+
+from multidict import CIMultiDict
+
+from . import reporter
+
+
+def _sample_results():
+    """Kết quả quét tối giản nhưng đúng hình dạng fetch_target trả về."""
+    # dict(CIMultiDict) giữ khóa istr (subclass của str) như entry["headers"].
+    headers = dict(CIMultiDict({"Content-Type": "text/html", "Server": "demo"}))
+    return [
+        {
+            "url": "https://example.com",
+            "status": 200,
+            "headers": headers,
+            "findings": [
+                {
+                    "rule": "HSTS_MISSING",
+                    "severity": "HIGH",
+                    "detail": "Strict-Transport-Security header missing.",
+                }
+            ],
+            "score": 10,
+            "risk": "HIGH",
+        }
+    ]
+
+
+def test_render_json_handles_istr_header_keys():
+    rendered = reporter.render_json(_sample_results())
+    decoded = json.loads(rendered)
+    assert decoded[0]["headers"]["Content-Type"] == "text/html"
+    assert decoded[0]["findings"][0]["rule"] == "HSTS_MISSING"
+
+
+def test_render_json_fallback_matches_orjson_output():
+    rendered = reporter.render_json(_sample_results())
+    saved = reporter.orjson
+    reporter.orjson = None
+    try:
+        fallback = reporter.render_json(_sample_results())
+    finally:
+        reporter.orjson = saved
+    assert json.loads(rendered) == json.loads(fallback)
@@ -2,19 +2,53 @@
 
 from __future__ import annotations
 
+import copy
 import socket
 import ssl
+from functools import lru_cache
 from typing import Dict, List
 from urllib.parse import urlparse
 
 
 def _format_name(rdns: List[tuple]) -> str:
     """Gộp tên trong subject/issuer thành chuỗi dễ đọc."""
-    parts = []
-    for rdn in rdns:
-        for key, value in rdn:
-            parts.append(f"{key}={value}")
-    return ", ".join(parts)
+    return ", ".join(f"{key}={value}" for rdn in rdns for key, value in rdn)
+
+
+def details_from_ssl_object(ssl_object) -> Dict[str, object]:
+    """Trích meta dữ liệu TLS từ một SSLObject/SSLSocket đang mở.
+
+    Cho phép tái sử dụng kết nối TLS mà aiohttp đã bắt tay khi GET,
+    thay vì mở thêm một kết nối riêng chỉ để đọc chứng chỉ.
+    """
+    try:
+        cipher_name, cipher_protocol, cipher_bits = ssl_object.cipher()
+        cert = ssl_object.getpeercert() or {}
+        subject_alt_names = [
+            value for key, value in cert.get("subjectAltName", []) if key == "DNS"
+        ]
+        details: Dict[str, object] = {
+            "protocol": ssl_object.version(),
+            "cipher": {
+                "name": cipher_name,
+                "protocol": cipher_protocol,
+                "bits": cipher_bits,
+            },
+        }
+        if cert:
+            details["certificate"] = {
+                "subject": _format_name(cert.get("subject", [])),
+                "issuer": _format_name(cert.get("issuer", [])),
+                "not_before": cert.get("notBefore"),
+                "not_after": cert.get("notAfter"),
+                "serial_number": cert.get("serialNumber"),
+                "subject_alt_names": ", ".join(subject_alt_names)
+                if subject_alt_names
+                else None,
+            }
+        return details
+    except Exception as exc:  # noqa: BLE001
+        return {"error": str(exc)}
 
 
 def fetch_tls_details(url: str) -> Dict[str, object]:
@@ -24,36 +58,58 @@ def fetch_tls_details(url: str) -> Dict[str, object]:
     if not host:
         return {"error": "Không xác định được hostname."}
     port = parsed.port or (80 if parsed.scheme == "http" else 443)
+    return _handshake(host, port)
 
-    context = ssl.create_default_context()
-    context.check_hostname = False
-    context.verify_mode = ssl.CERT_NONE
 
+def fetch_tls_details_parsed(target) -> Dict[str, object]:
+    """Như fetch_tls_details nhưng nhận mục tiêu đã parse (có host/port)."""
+    if not target.host:
+        return {"error": "Không xác định được hostname."}
+    return _handshake(target.host, target.port)
+
+
+def _handshake(host: str, port: int) -> Dict[str, object]:
+    """Bắt tay TLS và đọc chứng chỉ; cache kết quả thành công theo (host, port).
+
+    Lỗi (timeout, từ chối kết nối...) không được memoize — lru_cache bỏ
+    qua lời gọi ném exception — nên lần quét sau vẫn thử lại. Trả về bản
+    sao để caller có sửa dict cũng không làm bẩn cache.
+    """
     try:
-        with socket.create_connection((host, port), timeout=10) as sock:
-            with context.wrap_socket(sock, server_hostname=host) as tls:
-                cipher_name, cipher_protocol, cipher_bits = tls.cipher()
-                cert = tls.getpeercert()
-                subject_alt_names = [
-                    value for key, value in cert.get("subjectAltName", []) if key == "DNS"
-                ]
-                return {
-                    "protocol": tls.version(),
-                    "cipher": {
-                        "name": cipher_name,
-                        "protocol": cipher_protocol,
-                        "bits": cipher_bits,
-                    },
-                    "certificate": {
-                        "subject": _format_name(cert.get("subject", [])),
-                        "issuer": _format_name(cert.get("issuer", [])),
-                        "not_before": cert.get("notBefore"),
-                        "not_after": cert.get("notAfter"),
-                        "serial_number": cert.get("serialNumber"),
-                        "subject_alt_names": ", ".join(subject_alt_names)
-                        if subject_alt_names
-                        else None,
-                    },
-                }
+        return copy.deepcopy(_handshake_cached(host, port))
     except Exception as exc:  # noqa: BLE001
         return {"error": str(exc)}
+
+
+@lru_cache(maxsize=512)
+def _handshake_cached(host: str, port: int) -> Dict[str, object]:
+    """Bắt tay thật sự; nhiều URL cùng host chỉ trả phí một lần."""
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+
+    with socket.create_connection((host, port), timeout=10) as sock:
+        with context.wrap_socket(sock, server_hostname=host) as tls:
+            cipher_name, cipher_protocol, cipher_bits = tls.cipher()
+            cert = tls.getpeercert()
+            subject_alt_names = [
+                value for key, value in cert.get("subjectAltName", []) if key == "DNS"
+            ]
+            return {
+                "protocol": tls.version(),
+                "cipher": {
+                    "name": cipher_name,
+                    "protocol": cipher_protocol,
+                    "bits": cipher_bits,
+                },
+                "certificate": {
+                    "subject": _format_name(cert.get("subject", [])),
+                    "issuer": _format_name(cert.get("issuer", [])),
+                    "not_before": cert.get("notBefore"),
+                    "not_after": cert.get("notAfter"),
+                    "serial_number": cert.get("serialNumber"),
+                    "subject_alt_names": ", ".join(subject_alt_names)
+                    if subject_alt_names
+                    else None,
+                },
+            }
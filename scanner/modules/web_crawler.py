@@ -3,13 +3,23 @@
 from __future__ import annotations
 
 import asyncio
+import heapq
+import re
+import sys
+from functools import lru_cache
+from itertools import chain
 from html.parser import HTMLParser
-from typing import Dict, List, Optional, Set
-from urllib.parse import urljoin, urlparse
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import SplitResult, urljoin, urlparse, urlsplit
 
 import aiohttp
 
-from modules.js_renderer import JSRenderer
+try:
+    from selectolax.parser import HTMLParser as _SelectolaxParser  # type: ignore
+except ImportError:  # selectolax là tùy chọn; fallback dùng html.parser chuẩn.
+    _SelectolaxParser = None  # type: ignore
+
+from modules.js_renderer import JSRenderer, get_renderer
 
 
 class _StructureParser(HTMLParser):
@@ -24,39 +34,169 @@ class _StructureParser(HTMLParser):
         self.images: Set[str] = set()
 
     def handle_starttag(self, tag: str, attrs):  # type: ignore[override]
-        attr_map = {name.lower(): value for name, value in attrs}
+        # html.parser đã lowercase sẵn tên attr; quét thẳng list tuple để
+        # lấy đúng attr cần cho từng loại tag, không dựng dict trung gian.
         if tag == "a":
-            href = attr_map.get("href")
-            if href:
-                self.links.add(href)
+            for name, value in attrs:
+                if name == "href":
+                    if value:
+                        self.links.add(value)
+                    return
         elif tag == "form":
-            action = attr_map.get("action", "")
-            method = attr_map.get("method", "GET").upper()
+            action = ""
+            method = "GET"
+            for name, value in attrs:
+                if name == "action":
+                    action = value or ""
+                elif name == "method":
+                    method = (value or "GET").upper()
             self.forms.append({"action": action, "method": method})
         elif tag == "script":
-            src = attr_map.get("src")
-            if src:
-                self.scripts.add(src)
+            for name, value in attrs:
+                if name == "src":
+                    if value:
+                        self.scripts.add(value)
+                    return
         elif tag == "link":
-            rel = attr_map.get("rel", "")
-            href = attr_map.get("href")
+            rel = ""
+            href = None
+            for name, value in attrs:
+                if name == "rel":
+                    rel = value or ""
+                elif name == "href":
+                    href = value
             if href and "stylesheet" in rel.lower():
                 self.stylesheets.add(href)
         elif tag == "img":
-            src = attr_map.get("src")
-            if src:
-                self.images.add(src)
+            for name, value in attrs:
+                if name == "src":
+                    if value:
+                        self.images.add(value)
+                    return
+
+
+def _extract_structure(html: str) -> _StructureParser:
+    """Parse HTML and return link/form/asset collections.
+
+    Uses the C-backed selectolax parser when installed (an order of
+    magnitude faster than html.parser on large pages) and falls back to
+    the pure-Python ``_StructureParser`` otherwise. The returned object
+    exposes the same ``links``/``forms``/``scripts``/``stylesheets``/
+    ``images`` attributes either way.
+    """
+    parser = _StructureParser()
+    if _SelectolaxParser is None:
+        parser.feed(html)
+        return parser
+
+    tree = _SelectolaxParser(html)
+    for node in tree.css("a[href]"):
+        href = node.attributes.get("href")
+        if href:
+            parser.links.add(href)
+    for node in tree.css("form"):
+        action = node.attributes.get("action") or ""
+        method = (node.attributes.get("method") or "GET").upper()
+        parser.forms.append({"action": action, "method": method})
+    for node in tree.css("script[src]"):
+        src = node.attributes.get("src")
+        if src:
+            parser.scripts.add(src)
+    for node in tree.css("link[href]"):
+        rel = (node.attributes.get("rel") or "").lower()
+        href = node.attributes.get("href")
+        if href and "stylesheet" in rel:
+            parser.stylesheets.add(href)
+    for node in tree.css("img[src]"):
+        src = node.attributes.get("src")
+        if src:
+            parser.images.add(src)
+    return parser
+
+
+# Trang HTML lớn hơn ngưỡng này bị bỏ qua thay vì tải về để parse.
+_MAX_HTML_BYTES = 2 * 1024 * 1024
 
+# Nhận diện endpoint API: một lượt quét C-level thay cho cặp
+# substring + endswith lặp lại ở hai chỗ.
+_API_RE = re.compile(r"/api/|\.json$")
 
+# Link tuyệt đối phải *bắt đầu* bằng scheme hợp lệ; chỉ chứa "://" ở giữa
+# (ví dụ "redirect?to=https://...") vẫn là link tương đối. Chỉ nhận
+# scheme viết thường: dạng hiếm như "HTTPS://" rơi về urljoin để được
+# chuẩn hóa về chữ thường như baseline.
+_SCHEME_RE = re.compile(r"[a-z][a-z0-9+.-]*://")
+
+# Các helper URL thuần bên dưới được memoize: cùng một link/base xuất hiện
+# lặp lại rất nhiều lần trong một lượt crawl (menu, footer, phân trang...).
+
+
+@lru_cache(maxsize=4096)
 def _should_visit(link: str, base_netloc: str) -> bool:
     parsed = urlparse(link)
     if parsed.scheme and parsed.scheme not in {"http", "https"}:
         return False
-    if parsed.netloc and parsed.netloc != base_netloc:
+    # base_netloc đã được intern ở _crawl; intern netloc ứng viên để phép
+    # so sánh trúng nhánh so-sánh-con-trỏ của CPython trong trường hợp
+    # phổ biến "cùng host, khác path".
+    if parsed.netloc and sys.intern(parsed.netloc) != base_netloc:
         return False
     return True
 
 
+@lru_cache(maxsize=8192)
+def _join(base: str, rel: str) -> str:
+    return urljoin(base, rel)
+
+
+def _join_fast(base_split: SplitResult, rel: str) -> str:
+    """Join với base đã split sẵn, bỏ qua bước urljoin re-split base.
+
+    Link tuyệt đối, scheme-relative và absolute-path chiếm đa số trong
+    HTML thực tế và chỉ cần vài phép nối chuỗi; các dạng tương đối còn
+    lại (``./``, ``../``, query/fragment...) rơi về urljoin chuẩn.
+    """
+    if not rel:
+        return base_split.geturl()
+    if rel.startswith("//"):
+        return f"{base_split.scheme}:{rel}"
+    if rel.startswith("/"):
+        return f"{base_split.scheme}://{base_split.netloc}{rel}"
+    if _SCHEME_RE.match(rel):
+        return rel
+    return _join(base_split.geturl(), rel)
+
+
+def make_crawler_session(timeout: int = 8) -> aiohttp.ClientSession:
+    """Tạo ClientSession với connector đã tinh chỉnh cho crawl.
+
+    Crawl chủ yếu đập vào một host nên limit_per_host cao cùng DNS cache
+    giúp tái dùng kết nối (nhất là TLS) thay vì bắt tay lại từng trang.
+    Session nên được chia sẻ giữa các lượt ``crawl_site`` và đóng bởi
+    phía gọi.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=100,
+        limit_per_host=20,
+        ttl_dns_cache=300,
+        use_dns_cache=True,
+        ssl=False,
+        enable_cleanup_closed=True,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+    )
+
+
+@lru_cache(maxsize=1024)
+def _normalized_base(url: str) -> str:
+    parsed = urlparse(url)
+    if not parsed.path:
+        parsed = parsed._replace(path="/")
+    return parsed.geturl()
+
+
 async def crawl_site(
     session: aiohttp.ClientSession,
     base_url: str,
@@ -64,10 +204,15 @@ async def crawl_site(
     max_depth: int = 2,
     timeout: int = 8,
     enable_js: bool = True,
+    concurrency: int = 8,
 ) -> Dict[str, object]:
     """Breadth-first crawl to map internal links, forms, and static assets."""
 
-    async def _crawl(renderer: Optional[JSRenderer]) -> Dict[str, object]:
+    async def _crawl() -> Dict[str, object]:
+        # Renderer chỉ được lấy khi trang đầu tiên thật sự cần JS; site
+        # tĩnh không bao giờ trả phí khởi động Chromium.
+        renderer: Optional[JSRenderer] = None
+
         parsed_base = urlparse(base_url)
         resolved_base = base_url
         if not parsed_base.scheme:
@@ -77,6 +222,8 @@ async def crawl_site(
         if not parsed_base.netloc:
             return {}
 
+        base_netloc = sys.intern(parsed_base.netloc)
+
         if not parsed_base.path:
             parsed_base = parsed_base._replace(path="/")
             resolved_base = parsed_base.geturl()
@@ -87,6 +234,9 @@ async def crawl_site(
 
         discovered_links: Set[str] = set()
         forms: List[Dict[str, str]] = []
+        # Khóa (method, action) đã thấy; giữ list cho thứ tự đầu ra, set cho
+        # tra cứu O(1) thay vì dò tuyến tính "not in forms".
+        forms_seen: Set[Tuple[str, str]] = set()
         static_assets: Dict[str, Set[str]] = {
             "scripts": set(),
             "stylesheets": set(),
@@ -98,107 +248,135 @@ async def crawl_site(
         async def fetch(url: str) -> Optional[str]:
             try:
                 async with session.get(url, timeout=timeout, ssl=False) as response:
+                    # Quyết định bỏ qua dựa trên header trước khi đọc body:
+                    # ảnh/PDF/video hoặc trang quá lớn không bao giờ được tải.
                     content_type = response.headers.get("Content-Type", "")
                     if "text/html" not in content_type:
+                        response.close()
+                        return None
+                    content_length = response.headers.get("Content-Length")
+                    if content_length and content_length.isdigit() and int(content_length) > _MAX_HTML_BYTES:
+                        response.close()
                         return None
                     return await response.text()
             except Exception:  # noqa: BLE001
                 return None
 
-        def _normalized_base(url: str) -> str:
-            parsed = urlparse(url)
-            if not parsed.path:
-                parsed = parsed._replace(path="/")
-            return parsed.geturl()
-
-        while not to_visit.empty() and len(visited) < max_pages:
-            current_url, depth = await to_visit.get()
-            if current_url in visited:
-                continue
-            visited.add(current_url)
+        async def _process_page(current_url: str, depth: int) -> None:
+            nonlocal js_rendered_pages, renderer
 
             html = await fetch(current_url)
-            base_parser = _StructureParser()
-            if html:
-                base_parser.feed(html)
+            base_parser = _extract_structure(html) if html else _StructureParser()
 
-            has_meaningful_link = False
+            # Join mỗi link đúng một lần; tập absolute này vừa quyết định có
+            # cần render JS hay không, vừa được dùng lại khi enqueue bên dưới.
             base_for_join = _normalized_base(current_url)
-            for link_candidate in base_parser.links:
-                absolute_candidate = urljoin(base_for_join, link_candidate)
-                if _should_visit(absolute_candidate, parsed_base.netloc) and absolute_candidate != current_url:
-                    has_meaningful_link = True
-                    break
+            base_split = urlsplit(base_for_join)
+            absolutes = {_join_fast(base_split, link) for link in base_parser.links}
+            has_meaningful_link = any(
+                _should_visit(absolute, base_netloc) and absolute != current_url
+                for absolute in absolutes
+            )
 
             js_parser: Optional[_StructureParser] = None
             js_result = None
-            if renderer and renderer.ready and (not html or not has_meaningful_link):
-                js_result = await renderer.render(current_url, timeout_ms=timeout * 1000)
+            if enable_js and (not html or not has_meaningful_link):
+                if renderer is None:
+                    renderer = await get_renderer()
+                if renderer.ready:
+                    js_result = await renderer.render(current_url, timeout_ms=timeout * 1000)
                 if js_result and js_result.html:
-                    js_parser = _StructureParser()
-                    js_parser.feed(js_result.html)
+                    js_parser = _extract_structure(js_result.html)
                     html = js_result.html
                     js_rendered_pages += 1
                     for nav_url in js_result.navigated_urls:
-                        if nav_url != current_url and _should_visit(nav_url, parsed_base.netloc):
+                        if nav_url != current_url and _should_visit(nav_url, base_netloc):
                             discovered_links.add(nav_url)
                             if depth + 1 <= max_depth and nav_url not in visited:
                                 await to_visit.put((nav_url, depth + 1))
 
             if not html:
-                continue
+                return
 
-            combined_links = set(base_parser.links)
             combined_forms = list(base_parser.forms)
-            combined_assets = {
-                "scripts": set(base_parser.scripts),
-                "stylesheets": set(base_parser.stylesheets),
-                "images": set(base_parser.images),
-            }
 
             if js_parser:
-                combined_links.update(js_parser.links)
+                absolutes.update(_join_fast(base_split, link) for link in js_parser.links)
+                page_form_keys = {
+                    (form.get("method", "GET"), form.get("action", ""))
+                    for form in combined_forms
+                }
                 for form in js_parser.forms:
-                    if form not in combined_forms:
+                    key = (form.get("method", "GET"), form.get("action", ""))
+                    if key not in page_form_keys:
+                        page_form_keys.add(key)
                         combined_forms.append(form)
-                combined_assets["scripts"].update(js_parser.scripts)
-                combined_assets["stylesheets"].update(js_parser.stylesheets)
-                combined_assets["images"].update(js_parser.images)
 
             for form in combined_forms:
-                action = urljoin(current_url, form.get("action", "")) if form.get("action") else current_url
-                form_entry = {"method": form.get("method", "GET"), "action": action}
-                if form_entry not in forms:
-                    forms.append(form_entry)
-                if "/api/" in action or action.endswith(".json"):
+                action = _join_fast(base_split, form.get("action", "")) if form.get("action") else current_url
+                method = form.get("method", "GET")
+                key = (method, action)
+                if key not in forms_seen:
+                    forms_seen.add(key)
+                    forms.append({"method": method, "action": action})
+                if _API_RE.search(action):
                     api_endpoints.add(action)
 
-            for asset_type, values in combined_assets.items():
-                for rel_src in values:
-                    static_assets[asset_type].add(urljoin(current_url, rel_src))
+            # Đổ asset thẳng vào tập kết quả cuối, không qua các set trung gian.
+            empty: Set[str] = set()
+            asset_sources = (
+                ("scripts", base_parser.scripts, js_parser.scripts if js_parser else empty),
+                ("stylesheets", base_parser.stylesheets, js_parser.stylesheets if js_parser else empty),
+                ("images", base_parser.images, js_parser.images if js_parser else empty),
+            )
+            for asset_type, base_values, js_values in asset_sources:
+                bucket = static_assets[asset_type]
+                for rel_src in chain(base_values, js_values):
+                    bucket.add(_join_fast(base_split, rel_src))
 
-            for link in combined_links:
-                absolute = urljoin(base_for_join, link)
-                if not _should_visit(absolute, parsed_base.netloc):
+            for absolute in absolutes:
+                if not _should_visit(absolute, base_netloc):
                     continue
                 discovered_links.add(absolute)
                 if depth + 1 <= max_depth and absolute not in visited:
                     await to_visit.put((absolute, depth + 1))
-                if "/api/" in absolute or absolute.endswith(".json"):
+                if _API_RE.search(absolute):
                     api_endpoints.add(absolute)
 
+        # Worker pool: nhiều consumer cùng rút queue để các lượt fetch chồng
+        # lấp thời gian chờ mạng thay vì đi tuần tự từng trang. Kiểm tra và
+        # đánh dấu visited diễn ra trước await đầu tiên nên không cần khóa.
+        async def _worker() -> None:
+            while True:
+                current_url, depth = await to_visit.get()
+                try:
+                    if current_url in visited or len(visited) >= max_pages:
+                        continue
+                    visited.add(current_url)
+                    await _process_page(current_url, depth)
+                except Exception:  # noqa: BLE001 - một trang lỗi không dừng cả crawl
+                    pass
+                finally:
+                    to_visit.task_done()
+
+        workers = [asyncio.create_task(_worker()) for _ in range(concurrency)]
+        await to_visit.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
         return {
             "visited_count": len(visited),
-            "pages": sorted(discovered_links)[:max_pages],
+            # Chỉ cần max_pages phần tử nhỏ nhất: nsmallest là O(n log k)
+            # thay vì sort toàn bộ tập link rồi cắt prefix.
+            "pages": heapq.nsmallest(max_pages, discovered_links),
             "forms": forms,
             "static_assets": {key: sorted(list(values)) for key, values in static_assets.items()},
             "api_endpoints": sorted(list(api_endpoints)),
             "js_rendered_pages": js_rendered_pages,
+            # renderer là None khi không trang nào cần JS: coi như tắt.
             "js_enabled": bool(renderer and renderer.ready),
             "js_error": renderer.error if renderer and renderer.error else None,
         }
 
-    if enable_js:
-        async with JSRenderer() as renderer:
-            return await _crawl(renderer)
-    return await _crawl(None)
+    return await _crawl()
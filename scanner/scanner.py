@@ -2,12 +2,14 @@
 """Interactive TLS configuration scanner with optional web UI."""
 
 import asyncio
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional
 
 import typer
 from aiohttp import web
 from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
 
 from modules.fetcher import scan_targets
 from modules.input_manager import prepare_targets
@@ -20,7 +22,12 @@ BASE_DIR = Path(__file__).resolve().parent
 TEMPLATE_ENV = Environment(
     loader=FileSystemLoader(str(BASE_DIR)),
     autoescape=select_autoescape(),
+    # Template không đổi lúc chạy: tắt kiểm tra mtime mỗi lần render.
+    auto_reload=False,
+    cache_size=50,
 )
+# Compile template một lần lúc import thay vì trong serve().
+TEMPLATE = TEMPLATE_ENV.get_template("ui_template.html")
 
 
 @app.command()
@@ -42,26 +49,36 @@ def serve(
     host: str = typer.Option("0.0.0.0", "--host", help="Host interface for the UI."),
     port: int = typer.Option(8080, "--port", "-p", help="Port for the UI."),
 ) -> None:
-    template = TEMPLATE_ENV.get_template("ui_template.html")
-
     ui_state: Dict[str, object] = {
         "targets_text": "",
         "results": [],
         "log_result": None,
+        "version": 0,
     }
 
+    # Cache HTML đã render theo (version, message, log_message): các request
+    # lặp lại trên cùng trạng thái (nhất là trang chủ) chỉ render một lần.
+    # version được tăng mỗi khi handler thay đổi ui_state.
+    @lru_cache(maxsize=32)
+    def _render_cached(
+        version: int,
+        message: Optional[str],
+        log_message: Optional[str],
+    ) -> str:
+        return TEMPLATE.render(
+            message=message,
+            log_message=log_message,
+            targets_text=ui_state["targets_text"],
+            results=ui_state["results"],
+            log_result=ui_state.get("log_result"),
+        )
+
     async def render_page(
         message: Optional[str],
         log_message: Optional[str],
     ):
         return web.Response(
-            text=template.render(
-                message=message,
-                log_message=log_message,
-                targets_text=ui_state["targets_text"],
-                results=ui_state["results"],
-                log_result=ui_state.get("log_result"),
-            ),
+            text=_render_cached(ui_state["version"], message, log_message),
             content_type="text/html",
         )
 
@@ -73,6 +90,7 @@ def serve(
         raw_targets = reader.get("targets", "")
 
         ui_state["targets_text"] = raw_targets
+        ui_state["version"] += 1
         prepared = prepare_targets(raw_targets.splitlines())
         if not prepared:
             return await render_page(
@@ -82,7 +100,11 @@ def serve(
 
         results = await scan_targets(prepared, None)
         ui_state["results"] = results
-        message = f"Hoàn tất quét {len(prepared)} mục tiêu."
+        ui_state["version"] += 1
+        # Chuỗi do server sinh, không chứa dữ liệu người dùng: đánh dấu an
+        # toàn để Jinja bỏ qua bước escape. Các thông báo mang filename thì
+        # vẫn để autoescape xử lý.
+        message = Markup(f"Hoàn tất quét {len(prepared)} mục tiêu.")
         return await render_page(message, None)
 
     async def handle_log_scan(request: web.Request) -> web.Response:
@@ -99,19 +121,8 @@ def serve(
             return await render_page(None, "Hãy chọn file log trước khi phân tích.")
 
         summary = analyze_attack_surface("uploaded-log", log_content)
-        ui_state["log_result"] = {
-            "status": summary.status,
-            "findings": [
-                {
-                    "category": finding.category,
-                    "severity": finding.severity,
-                    "summary": finding.summary,
-                    "indicators": finding.indicators,
-                }
-                for finding in summary.findings
-            ],
-            "notes": summary.notes,
-        }
+        ui_state["log_result"] = summary.to_dict()
+        ui_state["version"] += 1
 
         log_message = (
             f"Đã phân tích log {filename}." if filename else "Đã phân tích file log tải lên."
@@ -4,26 +4,44 @@ from __future__ import annotations
 
 from typing import List, Optional, Sequence, Tuple
 
+try:  # numba/numpy are optional; the pure-Python solver below is the fallback.
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = None
+    njit = None
+
 Board = List[List[int]]
 
+# Box index for each cell, indexed as BOX_OF[row * 9 + col]: one byte load
+# instead of two divisions and a multiply per cell access.
+BOX_OF = bytes([(r // 3) * 3 + c // 3 for r in range(9) for c in range(9)])
+
+
+# Placeholder chars become 0; every other non-digit byte is deleted so the
+# whole cleanup happens in one C-level translate pass.
+_PUZZLE_TABLE = bytes.maketrans(b"._-", b"000")
+_PUZZLE_DELETE = bytes(b for b in range(256) if b not in b"0123456789._-")
+
 
 def parse_puzzle(puzzle: Sequence[str]) -> Board:
-    """Convert a flat iterable of characters into a 9x9 board."""
-    digits = []
-    for ch in puzzle:
-        if ch.isdigit():
-            digits.append(int(ch))
-        elif ch in {".", "_", "-"}:
-            digits.append(0)
-    if len(digits) != 81:
+    """Convert a flat iterable of characters into a 9x9 board.
+
+    Digits keep their value, ``.``/``_``/``-`` mark empty cells, and any
+    other character (whitespace, grid art) is ignored.
+    """
+    text = puzzle if isinstance(puzzle, str) else "".join(puzzle)
+    cells = text.encode("ascii", "ignore").translate(_PUZZLE_TABLE, _PUZZLE_DELETE)
+    if len(cells) != 81:
         raise ValueError("Sudoku puzzle must yield 81 cells")
-    board = [digits[i : i + 9] for i in range(0, 81, 9)]
-    return board
+    return [[b - 48 for b in cells[i : i + 9]] for i in range(0, 81, 9)]
 
 
 def serialize_board(board: Board) -> str:
     """Return board as a single string for easy comparison."""
-    return "".join(str(cell) for row in board for cell in row)
+    # Cells are 0-9, so offsetting by ord("0") builds the ASCII string
+    # directly without 81 per-int str() calls.
+    return bytes(cell + 48 for row in board for cell in row).decode("ascii")
 
 
 def find_empty(board: Board) -> Optional[Tuple[int, int]]:
@@ -63,18 +81,175 @@ def is_solved(board: Board) -> bool:
     return all(cell != 0 for row in board for cell in row)
 
 
+if njit is not None:
+    _BOX_OF_NB = np.frombuffer(BOX_OF, dtype=np.uint8)
+
+    @njit(cache=True, boundscheck=False)
+    def _solve_nb(cells, row_mask, col_mask, box_mask):  # pragma: no cover - JIT
+        """Iterative bitmask backtracking with MRV on a flat int8[81] board.
+
+        Mirrors the pure-Python ``backtrack`` below, rewritten without
+        recursion so Numba can compile it to a tight native loop.
+        """
+        empties = np.empty(81, np.int64)
+        count = 0
+        for i in range(81):
+            if cells[i] == 0:
+                empties[count] = i
+                count += 1
+        free_stack = np.zeros(count + 1, np.int64)
+        bit_stack = np.zeros(count + 1, np.int64)
+        pos = 0
+        forward = True
+        while True:
+            if pos == count:
+                return True
+            if forward:
+                best = pos
+                best_free = 0
+                best_count = 10
+                for idx in range(pos, count):
+                    i = empties[idx]
+                    r = i // 9
+                    c = i % 9
+                    free = 0x1FF & ~(row_mask[r] | col_mask[c] | box_mask[_BOX_OF_NB[i]])
+                    n = 0
+                    f = free
+                    while f:
+                        f &= f - 1
+                        n += 1
+                    if n < best_count:
+                        best = idx
+                        best_free = free
+                        best_count = n
+                        if n <= 1:
+                            break
+                tmp = empties[pos]
+                empties[pos] = empties[best]
+                empties[best] = tmp
+                free_stack[pos] = best_free
+            free = free_stack[pos]
+            i = empties[pos]
+            r = i // 9
+            c = i % 9
+            b = _BOX_OF_NB[i]
+            if free == 0:
+                if pos == 0:
+                    return False
+                cells[i] = 0
+                pos -= 1
+                i = empties[pos]
+                r = i // 9
+                c = i % 9
+                b = _BOX_OF_NB[i]
+                bit = bit_stack[pos]
+                row_mask[r] ^= bit
+                col_mask[c] ^= bit
+                box_mask[b] ^= bit
+                forward = False
+                continue
+            bit = free & -free
+            free_stack[pos] = free ^ bit
+            bit_stack[pos] = bit
+            row_mask[r] |= bit
+            col_mask[c] |= bit
+            box_mask[b] |= bit
+            digit = 0
+            while bit:
+                bit >>= 1
+                digit += 1
+            cells[i] = digit
+            pos += 1
+            forward = True
+
+else:
+    _solve_nb = None
+
+
 def solve(board: Board) -> bool:
-    """Solve the puzzle in-place using backtracking."""
-    empty = find_empty(board)
-    if not empty:
-        return True
-    row, col = empty
-    for candidate in sorted(valid_numbers(board, row, col)):
-        board[row][col] = candidate
-        if solve(board):
+    """Solve the puzzle in-place using bitmask backtracking.
+
+    Row/column/box occupancy is tracked as nine-bit integers (bit ``n-1``
+    set when digit ``n`` is present), updated incrementally on each
+    placement instead of rescanning the board and building sets per call.
+    Candidates are enumerated lowest-bit-first, which matches the old
+    ascending-digit order. When numba is installed the search runs in the
+    compiled ``_solve_nb`` kernel; otherwise the pure-Python ``backtrack``
+    below does the same work.
+    """
+    row_mask = [0] * 9
+    col_mask = [0] * 9
+    box_mask = [0] * 9
+    empties = []
+    for r in range(9):
+        for c in range(9):
+            value = board[r][c]
+            if not value:
+                empties.append((r, c))
+                continue
+            bit = 1 << (value - 1)
+            b = BOX_OF[r * 9 + c]
+            if (row_mask[r] | col_mask[c] | box_mask[b]) & bit:
+                return False  # conflicting givens: unsolvable
+            row_mask[r] |= bit
+            col_mask[c] |= bit
+            box_mask[b] |= bit
+
+    if _solve_nb is not None:
+        cells = np.array([value for row in board for value in row], dtype=np.int8)
+        if _solve_nb(
+            cells,
+            np.array(row_mask, dtype=np.int64),
+            np.array(col_mask, dtype=np.int64),
+            np.array(box_mask, dtype=np.int64),
+        ):
+            for r in range(9):
+                for c in range(9):
+                    board[r][c] = int(cells[r * 9 + c])
+            return True
+        return False
+
+    def backtrack(pos: int) -> bool:
+        if pos == len(empties):
             return True
-        board[row][col] = 0
-    return False
+        # MRV: branch on the empty cell with the fewest legal candidates.
+        # A cell with one candidate is a forced move, so stop scanning early;
+        # a cell with none means this branch is dead.
+        best = pos
+        best_free = -1
+        best_count = 10
+        for idx in range(pos, len(empties)):
+            r, c = empties[idx]
+            free = 0x1FF & ~(row_mask[r] | col_mask[c] | box_mask[BOX_OF[r * 9 + c]])
+            count = free.bit_count()
+            if count < best_count:
+                best = idx
+                best_free = free
+                best_count = count
+                if count <= 1:
+                    break
+        if best_count == 0:
+            return False
+        empties[pos], empties[best] = empties[best], empties[pos]
+        r, c = empties[pos]
+        b = BOX_OF[r * 9 + c]
+        free = best_free
+        while free:
+            bit = free & -free
+            free ^= bit
+            row_mask[r] |= bit
+            col_mask[c] |= bit
+            box_mask[b] |= bit
+            board[r][c] = bit.bit_length()
+            if backtrack(pos + 1):
+                return True
+            row_mask[r] ^= bit
+            col_mask[c] ^= bit
+            box_mask[b] ^= bit
+        board[r][c] = 0
+        return False
+
+    return backtrack(0)
 
 
 def solve_puzzle(puzzle: Sequence[str]) -> Board:
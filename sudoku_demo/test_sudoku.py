@@ -5,6 +5,29 @@ from . import sudoku
 PUZZLE = "530070000600195000098000060800060003400803001700020006060000280000419005000080079"
 SOLUTION = "534678912672195348198342567859761423426853791713924856961537284287419635345286179"
 
+# A 17-clue puzzle: forces real backtracking instead of pure forced moves.
+HARD_PUZZLE = "000000010400000000020000000000050407008000300001090000300400200050100000000806000"
+HARD_SOLUTION = "693784512487512936125963874932651487568247391741398625319475268856129743274836159"
+
+# No given conflicts with another, but row 1 uses digits 1-8 and the 9 in
+# the top-right box leaves the last cell of row 1 without any candidate.
+UNSOLVABLE_PUZZLE = "123456780" + "0" * 9 + "000000900" + "0" * 54
+
+# Two 1s in the same row: rejected up front as conflicting givens.
+CONFLICTING_PUZZLE = "11" + "0" * 79
+
+
+def run_on_each_solver(check):
+    """Run ``check`` once per solver backend (pure Python, numba if present)."""
+    kernel = sudoku._solve_nb
+    backends = [None] if kernel is None else [None, kernel]
+    try:
+        for backend in backends:
+            sudoku._solve_nb = backend
+            check()
+    finally:
+        sudoku._solve_nb = kernel
+
 
 def test_solver_finds_solution():
     board = sudoku.parse_puzzle(PUZZLE)
@@ -34,3 +57,30 @@ def test_unsolvable_puzzle_raises_value_error():
         return
     raise AssertionError("Unsolvable puzzle should raise ValueError")
 
+
+def test_solver_handles_hard_puzzle():
+    def check():
+        board = sudoku.parse_puzzle(HARD_PUZZLE)
+        assert sudoku.solve(board), "Solver should resolve the hard puzzle"
+        assert sudoku.serialize_board(board) == HARD_SOLUTION
+
+    run_on_each_solver(check)
+
+
+def test_unsolvable_puzzle_returns_false_and_leaves_board_untouched():
+    def check():
+        board = sudoku.parse_puzzle(UNSOLVABLE_PUZZLE)
+        original = [row[:] for row in board]
+        assert sudoku.solve(board) is False
+        assert board == original, "Failed solve must not modify the board"
+
+    run_on_each_solver(check)
+
+
+def test_conflicting_givens_return_false():
+    def check():
+        board = sudoku.parse_puzzle(CONFLICTING_PUZZLE)
+        assert sudoku.solve(board) is False
+
+    run_on_each_solver(check)
+